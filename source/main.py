@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
+# Requires Python 3.10+ (EdifactConfig is a slots=True dataclass).
 import logging
 import os
 import re
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from itertools import islice
 from datetime import datetime
-from typing import Dict, List, Optional, TypedDict, Union, Any, cast
-import copy
-from jsonschema import validate, ValidationError
+from typing import Callable, Dict, FrozenSet, List, Literal, Optional, Tuple, TypedDict, Union, Any, cast, overload
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import best_match
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 UNA_SEGMENT = "UNA:+.? '"
 ORDERS_MSG_TYPE = "ORDERS"
 DATE_FORMAT = "102"
+DEFAULT_QUALIFIERS: FrozenSet[str] = frozenset(["BY", "SU", "DP", "IV", "CB"])
 
 DATE_FORMATS: Dict[str, str] = {
     "102": "%Y%m%d",
@@ -23,8 +28,14 @@ DATE_FORMATS: Dict[str, str] = {
     "204": "%Y%m%d%H%M%S",
 }
 
-CONTROL_CHAR_REGEX = re.compile(r'[\x00-\x1F\x7F]')
+WRITE_BUFFER_SIZE = 64 * 1024
+
+_HUNDRED = Decimal(100)
+
 ESCAPE_CHARS = ["'", "+", ":", "*"]
+_CONTROL_DELETE = dict.fromkeys([*range(0x00, 0x20), 0x7F])
+_EDIFACT_ESCAPE_TABLE = str.maketrans({**_CONTROL_DELETE, **{c: f"?{c}" for c in ["?"] + ESCAPE_CHARS}})
+_NEEDS_ESCAPE_SEARCH = re.compile(r"[\x00-\x1F\x7F?'+:*]").search
 
 ORDER_SCHEMA = {
     "type": "object",
@@ -73,6 +84,9 @@ ORDER_SCHEMA = {
     }
 }
 
+Draft7Validator.check_schema(ORDER_SCHEMA)
+_ORDER_VALIDATOR = Draft7Validator(ORDER_SCHEMA)
+
 class OrderItem(TypedDict):
     product_code: str
     description: str
@@ -101,7 +115,7 @@ class OrderData(TypedDict, total=False):
     special_instructions: Optional[str]
     incoterms: Optional[str]
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EdifactConfig:
     una_segment: str = UNA_SEGMENT
     message_type: str = ORDERS_MSG_TYPE
@@ -116,11 +130,16 @@ class EdifactConfig:
     receiver_id: str = "RECEIVER"
     max_segment_length: int = 2000
     max_field_length: int = 70
-    allowed_qualifiers: List[str] = None
+    allowed_qualifiers: FrozenSet[str] = DEFAULT_QUALIFIERS
+    _quantum: Decimal = field(init=False, repr=False, compare=False)
+    _minor_scale: int = field(init=False, repr=False, compare=False)
+    _unh_suffix: str = field(init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.allowed_qualifiers is None:
-            self.allowed_qualifiers = ["BY", "SU", "DP", "IV", "CB"]
+            object.__setattr__(self, "allowed_qualifiers", DEFAULT_QUALIFIERS)
+        elif type(self.allowed_qualifiers) is not frozenset:
+            object.__setattr__(self, "allowed_qualifiers", frozenset(self.allowed_qualifiers))
         
         if not all(len(q) == 2 for q in self.allowed_qualifiers):
             raise ValueError("All qualifiers must be 2 characters")
@@ -128,241 +147,302 @@ class EdifactConfig:
         if self.max_segment_length < 10:
             raise ValueError("max_segment_length must be at least 10")
 
+        quantum = Decimal(self.decimal_rounding)
+        object.__setattr__(self, "_quantum", quantum)
+        object.__setattr__(self, "_minor_scale", 10 ** max(-quantum.as_tuple().exponent, 0))
+        object.__setattr__(self, "_unh_suffix", f"+{self.message_type}:{self.version}:{self.release}:{self.controlling_agency}'")
+
+_DEFAULT_CONFIG = EdifactConfig()
+
 class EdifactGenerationError(Exception):
     def __init__(self, message: str, code: str = "EDIFACT_001", details: Optional[Dict] = None):
         self.code = code
         self.details = details or {}
         super().__init__(f"{code}: {message}")
 
-class SegmentGenerator:
-    @staticmethod
-    def escape_edifact(value: Optional[str]) -> str:
-        if value is None:
-            return ""
-        s = str(value)
-        s = CONTROL_CHAR_REGEX.sub('', s)
-        s = s.replace("?", "??")
-        for char in ESCAPE_CHARS:
-            s = s.replace(char, f"?{char}")
+@lru_cache(maxsize=1024)
+def _escape_cached(s: str) -> str:
+    if _NEEDS_ESCAPE_SEARCH(s) is None:
         return s
+    return s.translate(_EDIFACT_ESCAPE_TABLE)
+
+def _escape_edifact(value: Optional[str]) -> str:
+    if value is None:
+        return ""
+    return _escape_cached(value if isinstance(value, str) else str(value))
+
+def _segment_too_long(segment: str, config: EdifactConfig) -> EdifactGenerationError:
+    return EdifactGenerationError(
+        f"Segment too long: {len(segment)} > {config.max_segment_length}",
+        "SEGMENT_001",
+        {"segment": segment[:100], "length": len(segment)}
+    )
 
-    @classmethod
-    def validate_segment_length(cls, segment: str, config: EdifactConfig) -> None:
-        if len(segment) > config.max_segment_length:
-            raise EdifactGenerationError(
-                f"Segment too long: {len(segment)} > {config.max_segment_length}",
-                "SEGMENT_001",
-                {"segment": segment[:100], "length": len(segment)}
-            )
+def _validate_segment_length(segment: str, config: EdifactConfig) -> None:
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
 
-    @classmethod
-    def validate_decimal_precision(cls, value: Decimal, config: EdifactConfig) -> None:
-        precision = Decimal(config.decimal_rounding)
-        if value != value.quantize(precision, rounding=ROUND_HALF_UP):
-            raise EdifactGenerationError(
-                f"Decimal value {value} exceeds configured precision {precision}",
-                "VALID_009"
-            )
+def _validate_decimal_precision(value: Decimal, config: EdifactConfig) -> Decimal:
+    precision = config._quantum
+    quantized = value.quantize(precision, rounding=ROUND_HALF_UP)
+    if value != quantized:
+        raise EdifactGenerationError(
+            f"Decimal value {value} exceeds configured precision {precision}",
+            "VALID_009"
+        )
+    return quantized
+
+def _unb(config: EdifactConfig, message_ref: str) -> str:
+    timestamp = time.strftime("%y%m%d%H%M")
+    segment = f"UNB+UNOA:2+{_escape_edifact(config.sender_id)}+{_escape_edifact(config.receiver_id)}+{timestamp}+{_escape_edifact(message_ref)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _una(config: EdifactConfig) -> str:
+    return config.una_segment
+
+def _unz(message_count: int = 1, message_ref: str = "", config: Optional[EdifactConfig] = None) -> str:
+    segment = f"UNZ+{message_count}+{_escape_edifact(message_ref)}'"
+    if config and len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _unh(message_ref: str, config: EdifactConfig) -> str:
+    segment = f"UNH+{_escape_edifact(message_ref)}{config._unh_suffix}"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _bgm(order_number: str, document_type: str = "220", config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"BGM+{document_type}+{_escape_edifact(order_number)}+9'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _dtm(qualifier: str, date: str, date_format: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"DTM+{qualifier}:{_escape_edifact(date)}:{date_format}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _nad(qualifier: str, party_id: str, name: Optional[str] = None, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    base = f"NAD+{_escape_edifact(qualifier)}+{_escape_edifact(party_id)}::91"
+    if name:
+        if len(name) > config.max_field_length:
+            name = name[:config.max_field_length]
+        segment = f"{base}++{_escape_edifact(name)}'"
+    else:
+        segment = f"{base}'"
+    
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _com(contact: str, contact_type: str = "TE", config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"COM+{_escape_edifact(contact)}:{_escape_edifact(contact_type)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _lin(line_num: int, product_code: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"LIN+{line_num}++{_escape_edifact(product_code)}:EN'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _imd(description: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    if len(description) > config.max_field_length:
+        description = description[:config.max_field_length]
+    segment = f"IMD+F++:::{_escape_edifact(description)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _qty(quantity: int, unit: str = "EA", config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"QTY+21:{quantity}:{_escape_edifact(unit)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _pri(price: Decimal, config: EdifactConfig, unit: str = "EA") -> str:
+    q = _validate_decimal_precision(price, config)
+    segment = f"PRI+AAA:{q:f}:{_escape_edifact(unit)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _moa(qualifier: str, amount: Decimal, config: EdifactConfig) -> str:
+    q = _validate_decimal_precision(amount, config)
+    segment = f"MOA+{_escape_edifact(qualifier)}:{q:f}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _tax(rate: Decimal, tax_type: str = "VAT", config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    fmt_rate = _validate_decimal_precision(rate, config)
+    segment = f"TAX+7+{_escape_edifact(tax_type)}+++:::{fmt_rate:f}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _loc(qualifier: str, location: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"LOC+{_escape_edifact(qualifier)}+{_escape_edifact(location)}:92'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _pai(terms: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"PAI+{_escape_edifact(terms)}:3'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _tod(incoterms: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"TOD+5++{_escape_edifact(incoterms)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _unt(segment_count: int, message_ref: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"UNT+{segment_count}+{_escape_edifact(message_ref)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _ftx(text: str, qualifier: str = "AAI", sequence: int = 1, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    if len(text) > config.max_field_length:
+        text = text[:config.max_field_length]
+    segment = f"FTX+{qualifier}+{sequence}+++{_escape_edifact(text)}'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
+
+def _cux(currency: str, config: Optional[EdifactConfig] = None) -> str:
+    if config is None:
+        config = _DEFAULT_CONFIG
+    segment = f"CUX+2:{_escape_edifact(currency)}:9'"
+    if len(segment) > config.max_segment_length:
+        raise _segment_too_long(segment, config)
+    return segment
 
-    @classmethod
-    def unb(cls, config: EdifactConfig, message_ref: str) -> str:
-        timestamp = datetime.now().strftime("%y%m%d%H%M")
-        segment = f"UNB+UNOA:2+{cls.escape_edifact(config.sender_id)}+{cls.escape_edifact(config.receiver_id)}+{timestamp}+{cls.escape_edifact(message_ref)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def una(cls, config: EdifactConfig) -> str:
-        return config.una_segment
-
-    @classmethod
-    def unz(cls, message_count: int = 1, message_ref: str = "", config: Optional[EdifactConfig] = None) -> str:
-        segment = f"UNZ+{message_count}+{cls.escape_edifact(message_ref)}'"
-        if config:
-            cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def unh(cls, message_ref: str, config: EdifactConfig) -> str:
-        segment = f"UNH+{cls.escape_edifact(message_ref)}+{config.message_type}:{config.version}:{config.release}:{config.controlling_agency}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def bgm(cls, order_number: str, document_type: str = "220", config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"BGM+{document_type}+{cls.escape_edifact(order_number)}+9'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def dtm(cls, qualifier: str, date: str, date_format: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"DTM+{qualifier}:{cls.escape_edifact(date)}:{date_format}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def nad(cls, qualifier: str, party_id: str, name: Optional[str] = None, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        base = f"NAD+{cls.escape_edifact(qualifier)}+{cls.escape_edifact(party_id)}::91"
-        if name:
-            if len(name) > config.max_field_length:
-                name = name[:config.max_field_length]
-            segment = f"{base}++{cls.escape_edifact(name)}'"
-        else:
-            segment = f"{base}'"
-        
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def com(cls, contact: str, contact_type: str = "TE", config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"COM+{cls.escape_edifact(contact)}:{cls.escape_edifact(contact_type)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def lin(cls, line_num: int, product_code: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"LIN+{line_num}++{cls.escape_edifact(product_code)}:EN'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def imd(cls, description: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        if len(description) > config.max_field_length:
-            description = description[:config.max_field_length]
-        segment = f"IMD+F++:::{cls.escape_edifact(description)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def qty(cls, quantity: int, unit: str = "EA", config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"QTY+21:{quantity}:{cls.escape_edifact(unit)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def pri(cls, price: Decimal, config: EdifactConfig, unit: str = "EA") -> str:
-        cls.validate_decimal_precision(price, config)
-        q = price.quantize(Decimal(config.decimal_rounding), rounding=ROUND_HALF_UP)
-        segment = f"PRI+AAA:{q}:{cls.escape_edifact(unit)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def moa(cls, qualifier: str, amount: Decimal, config: EdifactConfig) -> str:
-        cls.validate_decimal_precision(amount, config)
-        q = amount.quantize(Decimal(config.decimal_rounding), rounding=ROUND_HALF_UP)
-        segment = f"MOA+{cls.escape_edifact(qualifier)}:{q}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def tax(cls, rate: Decimal, tax_type: str = "VAT", config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        cls.validate_decimal_precision(rate, config)
-        if config:
-            fmt_rate = rate.quantize(Decimal(config.decimal_rounding), rounding=ROUND_HALF_UP)
-        else:
-            fmt_rate = rate
-        segment = f"TAX+7+{cls.escape_edifact(tax_type)}+++:::{fmt_rate}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def loc(cls, qualifier: str, location: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"LOC+{cls.escape_edifact(qualifier)}+{cls.escape_edifact(location)}:92'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def pai(cls, terms: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"PAI+{cls.escape_edifact(terms)}:3'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def tod(cls, incoterms: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"TOD+5++{cls.escape_edifact(incoterms)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def unt(cls, segment_count: int, message_ref: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"UNT+{segment_count}+{cls.escape_edifact(message_ref)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def ftx(cls, text: str, qualifier: str = "AAI", sequence: int = 1, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        if len(text) > config.max_field_length:
-            text = text[:config.max_field_length]
-        segment = f"FTX+{qualifier}+{sequence}+++{cls.escape_edifact(text)}'"
-        cls.validate_segment_length(segment, config)
-        return segment
-
-    @classmethod
-    def cux(cls, currency: str, config: Optional[EdifactConfig] = None) -> str:
-        if config is None:
-            config = EdifactConfig()
-        segment = f"CUX+2:{cls.escape_edifact(currency)}:9'"
-        cls.validate_segment_length(segment, config)
-        return segment
+class SegmentGenerator:
+    escape_edifact = staticmethod(_escape_edifact)
+    validate_segment_length = staticmethod(_validate_segment_length)
+    validate_decimal_precision = staticmethod(_validate_decimal_precision)
+    unb = staticmethod(_unb)
+    una = staticmethod(_una)
+    unz = staticmethod(_unz)
+    unh = staticmethod(_unh)
+    bgm = staticmethod(_bgm)
+    dtm = staticmethod(_dtm)
+    nad = staticmethod(_nad)
+    com = staticmethod(_com)
+    lin = staticmethod(_lin)
+    imd = staticmethod(_imd)
+    qty = staticmethod(_qty)
+    pri = staticmethod(_pri)
+    moa = staticmethod(_moa)
+    tax = staticmethod(_tax)
+    loc = staticmethod(_loc)
+    pai = staticmethod(_pai)
+    tod = staticmethod(_tod)
+    unt = staticmethod(_unt)
+    ftx = staticmethod(_ftx)
+    cux = staticmethod(_cux)
+
+def _parse_102(s: str) -> datetime:
+    return datetime(int(s[0:4]), int(s[4:6]), int(s[6:8]))
+
+def _parse_203(s: str) -> datetime:
+    return datetime(int(s[0:4]), int(s[4:6]), int(s[6:8]), int(s[8:10]), int(s[10:12]))
+
+def _parse_101(s: str) -> datetime:
+    year = int(s[0:2])
+    year += 2000 if year < 69 else 1900
+    return datetime(year, int(s[2:4]), int(s[4:6]))
+
+def _parse_204(s: str) -> datetime:
+    return datetime(int(s[0:4]), int(s[4:6]), int(s[6:8]), int(s[8:10]), int(s[10:12]), int(s[12:14]))
+
+_DATE_PARSERS: Dict[str, Tuple[int, Callable[[str], datetime]]] = {
+    "102": (8, _parse_102),
+    "203": (12, _parse_203),
+    "101": (6, _parse_101),
+    "204": (14, _parse_204),
+}
 
 def validate_date(date_str: str, date_format: str) -> bool:
-    fmt = DATE_FORMATS.get(date_format)
-    if not fmt:
+    parser = _DATE_PARSERS.get(date_format)
+    if parser is None:
+        return False
+    length, parse = parser
+    if not isinstance(date_str, str) or len(date_str) != length or not date_str.isdigit():
         return False
     try:
-        datetime.strptime(date_str, fmt)
+        parse(date_str)
         return True
-    except (ValueError, TypeError):
+    except ValueError:
         return False
 
 def sanitize_input(data: Dict[str, Any]) -> Dict[str, Any]:
-    sanitized = {}
-    for key, value in data.items():
-        if isinstance(value, str):
-            sanitized[key] = CONTROL_CHAR_REGEX.sub('', value)
-        elif isinstance(value, dict):
-            sanitized[key] = sanitize_input(value)
-        elif isinstance(value, list):
-            sanitized[key] = [sanitize_input(item) if isinstance(item, dict) else item for item in value]
-        else:
-            sanitized[key] = value
+    sanitized: Dict[str, Any] = {}
+    stack = [(data, sanitized)]
+    while stack:
+        source, target = stack.pop()
+        for key, value in source.items():
+            value_type = type(value)
+            if value_type is dict:
+                child: Dict[str, Any] = {}
+                stack.append((value, child))
+                target[key] = child
+            elif value_type is list:
+                items = []
+                for item in value:
+                    if type(item) is dict:
+                        child = {}
+                        stack.append((item, child))
+                        items.append(child)
+                    else:
+                        items.append(item)
+                target[key] = items
+            else:
+                target[key] = value
     return sanitized
 
 def validate_with_schema(data: Dict[str, Any]) -> None:
-    try:
-        validate(instance=data, schema=ORDER_SCHEMA)
-    except ValidationError as e:
-        raise EdifactGenerationError(f"Schema validation failed: {e.message}", "SCHEMA_001")
+    error = best_match(_ORDER_VALIDATOR.iter_errors(data))
+    if error is not None:
+        raise EdifactGenerationError(f"Schema validation failed: {error.message}", "SCHEMA_001")
 
 def validate_order_data(data: Dict[str, Any], config: EdifactConfig) -> OrderData:
-    data_copy = sanitize_input(copy.deepcopy(data))
+    data_copy = sanitize_input(data)
     
     validate_with_schema(data_copy)
     
@@ -416,18 +496,24 @@ def validate_order_data(data: Dict[str, Any], config: EdifactConfig) -> OrderDat
                     {"item_index": idx, "price": item["price"]}
                 )
             
+            product_code = item["product_code"]
+            description = item.get("description", "")
+            quantity = item["quantity"]
+            price = item["price"]
+            unit = item.get("unit", "EA")
             converted_item: OrderItem = {
-                "product_code": str(item["product_code"]),
-                "description": str(item.get("description", "")),
-                "quantity": int(item["quantity"]),
-                "price": Decimal(str(item["price"])),
-                "unit": str(item.get("unit", "EA"))
+                "product_code": product_code if type(product_code) is str else str(product_code),
+                "description": description if type(description) is str else str(description),
+                "quantity": quantity if type(quantity) is int else int(quantity),
+                "price": price if type(price) is Decimal else Decimal(str(price)),
+                "unit": unit if type(unit) is str else str(unit)
             }
             converted_items.append(converted_item)
         data_copy["items"] = converted_items
 
-        if "tax_rate" in data_copy and data_copy.get("tax_rate") is not None:
-            data_copy["tax_rate"] = Decimal(str(data_copy["tax_rate"]))
+        tax_rate = data_copy.get("tax_rate")
+        if tax_rate is not None and type(tax_rate) is not Decimal:
+            data_copy["tax_rate"] = Decimal(str(tax_rate))
     except (ValueError, TypeError, KeyError) as e:
         raise EdifactGenerationError(f"Invalid numeric format: {str(e)}", "VALID_005")
 
@@ -443,7 +529,7 @@ def validate_order_data(data: Dict[str, Any], config: EdifactConfig) -> OrderDat
             raise EdifactGenerationError(
                 f"Invalid qualifier '{p['qualifier']}' in party {idx}",
                 "VALID_008",
-                {"party_index": idx, "qualifier": p["qualifier"], "allowed": config.allowed_qualifiers}
+                {"party_index": idx, "qualifier": p["qualifier"], "allowed": sorted(config.allowed_qualifiers)}
             )
 
     return cast(OrderData, data_copy)
@@ -456,119 +542,198 @@ def validate_file_path(filename: str) -> None:
     if not filename.lower().endswith(('.edi', '.edifact')):
         logger.warning("Recommended file extension is .edi or .edifact")
 
+def _write_segments(segments: List[str], config: EdifactConfig, output_file: str) -> None:
+    line_ending = config.line_ending.encode("utf-8")
+    with open(output_file, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(segments[0].encode("utf-8"))
+        f.writelines(line_ending + s.encode("utf-8") for s in islice(segments, 1, None))
+
+class EdifactOrderEmitter:
+    def __init__(self, config: EdifactConfig = _DEFAULT_CONFIG):
+        self.config = config
+        self._una = config.una_segment if config.include_una else None
+        self._date_format = config.date_format
+        self._quantum = config._quantum
+        self._scale = config._minor_scale
+        self._line_ending = config.line_ending
+
+    def build_segments(self, validated_data: OrderData) -> List[str]:
+        config = self.config
+        date_format = self._date_format
+        segments: List[str] = []
+        append = segments.append
+
+        if self._una is not None:
+            append(self._una)
+
+        append(_unb(config, validated_data["message_ref"]))
+        unh_index = len(segments)
+        append(_unh(validated_data["message_ref"], config))
+        append(_bgm(validated_data["order_number"], "220", config))
+        append(_dtm("137", validated_data["order_date"], date_format, config))
+
+        if delivery_date := validated_data.get("delivery_date"):
+            append(_dtm("2", delivery_date, date_format, config))
+
+        if currency := validated_data.get("currency"):
+            append(_cux(currency, config))
+
+        for party in validated_data["parties"]:
+            append(_nad(
+                party["qualifier"],
+                party["id"],
+                party.get("name"),
+                config
+            ))
+            if address := party.get("address"):
+                append(_com(address, "AD", config))
+            if contact := party.get("contact"):
+                append(_com(contact, "TE", config))
+
+        lin, imd, qty, pri = _lin, _imd, _qty, _pri
+        scale = self._scale
+        total_minor = 0
+        for idx, item in enumerate(validated_data["items"], 1):
+            quantity = int(item["quantity"])
+            price: Decimal = item["price"]
+            unit = item.get("unit", "EA") or "EA"
+
+            append(lin(idx, item["product_code"], config))
+            if description := item.get("description"):
+                append(imd(description, config))
+            append(qty(quantity, unit, config))
+            append(pri(price, config, unit))
+            total_minor += int(price * scale) * quantity
+        total_amount = Decimal(total_minor) / scale
+
+        tax_rate: Optional[Decimal] = validated_data.get("tax_rate")
+        if tax_rate is not None:
+            tax_amount = (total_amount * tax_rate / _HUNDRED).quantize(self._quantum, rounding=ROUND_HALF_UP)
+            append(_tax(tax_rate, "VAT", config))
+            append(_moa("124", tax_amount, config))
+            total_amount += tax_amount
+
+        if delivery_location := validated_data.get("delivery_location"):
+            append(_loc("11", delivery_location, config))
+
+        if payment_terms := validated_data.get("payment_terms"):
+            append(_pai(payment_terms, config))
+
+        if incoterms := validated_data.get("incoterms"):
+            append(_tod(incoterms, config))
+
+        if instructions := validated_data.get("special_instructions"):
+            step = config.max_field_length
+            for seq, start in enumerate(range(0, len(instructions), step), 1):
+                append(_ftx(instructions[start:start + step], "AAI", seq, config))
+
+        append(_moa("79", total_amount, config))
+
+        segment_count = len(segments) - unh_index
+        append(_unt(segment_count, validated_data["message_ref"], config))
+        append(_unz(1, validated_data["message_ref"], config))
+
+        return segments
+
+    @overload
+    def emit(
+        self,
+        data: Dict[str, Any],
+        output_file: Optional[str] = None,
+        return_message: Literal[True] = True,
+    ) -> str: ...
+
+    @overload
+    def emit(
+        self,
+        data: Dict[str, Any],
+        output_file: Optional[str] = None,
+        *,
+        return_message: Literal[False],
+    ) -> None: ...
+
+    @overload
+    def emit(
+        self,
+        data: Dict[str, Any],
+        output_file: Optional[str] = None,
+        return_message: bool = True,
+    ) -> Optional[str]: ...
+
+    def emit(
+        self,
+        data: Dict[str, Any],
+        output_file: Optional[str] = None,
+        return_message: bool = True,
+    ) -> Optional[str]:
+        if not return_message and not output_file:
+            raise ValueError("return_message=False requires an output_file")
+
+        logger.info(f"Starting EDIFACT generation for order {data.get('order_number', 'Unknown')}")
+        
+        try:
+            validated_data = validate_order_data(data, self.config)
+        except EdifactGenerationError as e:
+            logger.error(f"Validation failed: {e.code} - {e}")
+            if e.details:
+                logger.error(f"Details: {e.details}")
+            raise
+
+        segments = self.build_segments(validated_data)
+
+        logger.debug(f"Generated {len(segments)} segments")
+
+        if output_file:
+            try:
+                validate_file_path(output_file)
+                _write_segments(segments, self.config, output_file)
+                logger.info(f"EDIFACT message written to {output_file}")
+            except IOError as e:
+                logger.error(f"Failed to write file: {e}")
+                raise EdifactGenerationError("File write failed", "IO_001") from e
+
+        if not return_message:
+            return None
+        return self._line_ending.join(segments)
+
+@overload
 def generate_edifact_orders(
     data: Dict[str, Any],
-    config: EdifactConfig = EdifactConfig(),
+    config: EdifactConfig = _DEFAULT_CONFIG,
     output_file: Optional[str] = None,
-) -> str:
-    logger.info(f"Starting EDIFACT generation for order {data.get('order_number', 'Unknown')}")
-    
-    try:
-        validated_data = validate_order_data(data, config)
-    except EdifactGenerationError as e:
-        logger.error(f"Validation failed: {e.code} - {e}")
-        if e.details:
-            logger.error(f"Details: {e.details}")
-        raise
-
-    segments: List[str] = []
-
-    if config.include_una:
-        segments.append(SegmentGenerator.una(config))
-
-    segments.append(SegmentGenerator.unb(config, validated_data["message_ref"]))
-    segments.append(SegmentGenerator.unh(validated_data["message_ref"], config))
-    segments.append(SegmentGenerator.bgm(validated_data["order_number"], "220", config))
-    segments.append(SegmentGenerator.dtm("137", validated_data["order_date"], config.date_format, config))
-
-    if validated_data.get("delivery_date"):
-        segments.append(SegmentGenerator.dtm("2", validated_data["delivery_date"], config.date_format, config))
-
-    if validated_data.get("currency"):
-        segments.append(SegmentGenerator.cux(validated_data["currency"], config))
-
-    for party in validated_data["parties"]:
-        segments.append(SegmentGenerator.nad(
-            party["qualifier"],
-            party["id"],
-            party.get("name"),
-            config
-        ))
-        if party.get("address"):
-            segments.append(SegmentGenerator.com(party["address"], "AD", config))
-        if party.get("contact"):
-            segments.append(SegmentGenerator.com(party["contact"], "TE", config))
-
-    total_amount = Decimal("0.00")
-    for idx, item in enumerate(validated_data["items"], 1):
-        quantity = int(item["quantity"])
-        price: Decimal = item["price"]
-        unit = item.get("unit", "EA") or "EA"
-        line_total = (price * Decimal(quantity)).quantize(Decimal(config.decimal_rounding), rounding=ROUND_HALF_UP)
-
-        segments.append(SegmentGenerator.lin(idx, item["product_code"], config))
-        if item.get("description"):
-            segments.append(SegmentGenerator.imd(item["description"], config))
-        segments.append(SegmentGenerator.qty(quantity, unit, config))
-        segments.append(SegmentGenerator.pri(price, config, unit))
-        total_amount += line_total
-
-    if validated_data.get("tax_rate") is not None:
-        tax_rate: Decimal = validated_data["tax_rate"]
-        tax_amount = (total_amount * tax_rate / Decimal("100")).quantize(Decimal(config.decimal_rounding), rounding=ROUND_HALF_UP)
-        segments.append(SegmentGenerator.tax(tax_rate, "VAT", config))
-        segments.append(SegmentGenerator.moa("124", tax_amount, config))
-        total_amount += tax_amount
-
-    if validated_data.get("delivery_location"):
-        segments.append(SegmentGenerator.loc("11", validated_data["delivery_location"], config))
-
-    if validated_data.get("payment_terms"):
-        segments.append(SegmentGenerator.pai(validated_data["payment_terms"], config))
-
-    if validated_data.get("incoterms"):
-        segments.append(SegmentGenerator.tod(validated_data["incoterms"], config))
-
-    if validated_data.get("special_instructions"):
-        instructions = validated_data["special_instructions"]
-        chunks = [instructions[i:i+config.max_field_length] for i in range(0, len(instructions), config.max_field_length)]
-        for i, chunk in enumerate(chunks, 1):
-            segments.append(SegmentGenerator.ftx(chunk, "AAI", i, config))
-
-    segments.append(SegmentGenerator.moa("79", total_amount, config))
-
-    unh_index = None
-    for i, s in enumerate(segments):
-        if s.startswith("UNH+"):
-            unh_index = i
-            break
-
-    if unh_index is None:
-        raise EdifactGenerationError("UNH segment missing", "GEN_001")
-
-    segment_count = len(segments) - unh_index
-    segments.append(SegmentGenerator.unt(segment_count, validated_data["message_ref"], config))
-    segments.append(SegmentGenerator.unz(1, validated_data["message_ref"], config))
-
-    edifact_message = config.line_ending.join(segments)
-
-    logger.debug(f"Generated {len(segments)} segments")
-
-    if output_file:
-        try:
-            validate_file_path(output_file)
-            with open(output_file, "w", encoding="utf-8", newline="") as f:
-                f.write(edifact_message)
-            logger.info(f"EDIFACT message written to {output_file}")
-        except IOError as e:
-            logger.error(f"Failed to write file: {e}")
-            raise EdifactGenerationError("File write failed", "IO_001") from e
+    return_message: Literal[True] = True,
+) -> str: ...
 
-    return edifact_message
+@overload
+def generate_edifact_orders(
+    data: Dict[str, Any],
+    config: EdifactConfig = _DEFAULT_CONFIG,
+    output_file: Optional[str] = None,
+    *,
+    return_message: Literal[False],
+) -> None: ...
+
+@overload
+def generate_edifact_orders(
+    data: Dict[str, Any],
+    config: EdifactConfig = _DEFAULT_CONFIG,
+    output_file: Optional[str] = None,
+    return_message: bool = True,
+) -> Optional[str]: ...
+
+def generate_edifact_orders(
+    data: Dict[str, Any],
+    config: EdifactConfig = _DEFAULT_CONFIG,
+    output_file: Optional[str] = None,
+    return_message: bool = True,
+) -> Optional[str]:
+    return EdifactOrderEmitter(config).emit(data, output_file, return_message)
 
 if __name__ == "__main__":
     from datetime import datetime, timedelta
 
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
     sample_order = {
         "message_ref": "ORD0001",
         "order_number": "2025-0509-A",